@@ -3,7 +3,9 @@
 
 Provides an algorithm to compute a placement of sensors in a tree that
 minimizes the expected distance between the real and the estimates source. It
-only works for trees and assumes that all vertices have unit cost.
+only works for trees. By default all vertices have unit cost; integer costs
+can be given to the leaves, in which case the budget bounds the total cost of
+the sensors.
 
 A simple example:
 
@@ -12,18 +14,24 @@ A simple example:
    nb_sensors = 10
    exp_dist, sensors = optimal_placement(tree, nb_sensors)
 
+   costs = {x: random.randint(1, 5) for x in utilities.find_leaves(tree)}
+   exp_dist, sensors = optimal_placement(tree, 20, costs)
+
 """
 
 import functools32 as functools
 import random
 
+import kbest
 import preprocess_exp_dist
 import utilities
 
 INFINITY = float('infinity')
+NO_CONSTRAINTS = frozenset()
 
 
-def optimal_placement(tree, budget):
+def optimal_placement(tree, budget, costs=None, epsilon=None, mandatory=(),
+        forbidden=(), prune=False, stats=None):
     """
     Place `budget` sensors on a tree in an optimal way.
 
@@ -33,21 +41,205 @@ def optimal_placement(tree, budget):
         A tree (undirected) on which to place the sensors.
     budget : int
         The sensor budget, i.e. the number of nodes that can be choosen
-        as sensors.
+        as sensors, or their maximum total cost if `costs` is given.
+    costs : dict, optional
+        Associates every leaf to its (positive integer) cost. The running
+        time grows quadratically with the budget.
+    epsilon : float, optional
+        If given together with `costs`, the costs are scaled so that the
+        dynamic program only handles budgets of O(k / epsilon), k being the
+        largest number of sensors within the budget. The placement is then
+        at least as good as the optimal one, but its cost may exceed the
+        budget by a factor (1 + epsilon).
+    mandatory : iterable, optional
+        Leaves that must hold a sensor.
+    forbidden : iterable, optional
+        Leaves that cannot hold a sensor.
+    prune : bool, optional
+        Whether to skip the splits of the budget that cannot be feasible or
+        whose lower bound on the expected distance is no better than that of
+        a split already evaluated. The optimal expected distance is the same.
+    stats : dict, optional
+        If given, it receives the number of `splits` of the budget
+        considered, of those `pruned` and of the DP `states` computed.
 
     Returns
     -------
     (exp_dist, obs) : tuple
         `exp_dist` is the expected distance, and `obs` a tuple containing the 
-        sensors.
+        sensors. If the constraints cannot be met, `exp_dist` is infinite and
+        `obs` is empty.
     """
 
-    #one single sensor is useless
-    assert budget >= 2
+    placements = constrained_placements(tree, budget,
+            [(mandatory, forbidden)], costs, epsilon, prune, stats)
+    exp_dist, obs = next(placements)
+    placements.close()
+    return (exp_dist, obs)
+
+
+def constrained_placements(tree, budget, scenarios, costs=None,
+        epsilon=None, prune=False, stats=None):
+    """
+    Place `budget` sensors on a tree in an optimal way under a sequence of
+    constraints on the leaves, preprocessing the tree only once.
+
+    From one scenario to the next, only the DP states of the nodes above the
+    constrained leaves are recomputed.
+
+    Parameters
+    ----------
+    tree : networkx.Graph
+        See doc for `optimal_placement`
+    budget : int
+        See doc for `optimal_placement`
+    scenarios : iterable
+        Tuples (mandatory, forbidden), see doc for `optimal_placement`. They
+        are read one at a time, so they can be chosen interactively.
+    costs : dict, optional
+        See doc for `optimal_placement`
+    epsilon : float, optional
+        See doc for `optimal_placement`
+    prune : bool, optional
+        See doc for `optimal_placement`
+    stats : dict, optional
+        See doc for `optimal_placement`, the counts are summed over all
+        scenarios.
+
+    Returns
+    -------
+    A generator of tuples (exp_dist, obs), one for each scenario, see doc for
+    `optimal_placement`.
+    """
+    leaves, directed, totals = preprocess(tree, budget, costs, epsilon,
+            prune)
+    return solve(tree, budget, scenarios, costs, leaves, directed, totals,
+            stats)
+
+
+def solve(tree, budget, scenarios, costs, leaves, directed, totals,
+        stats=None):
+    """
+    Place the sensors for every scenario on a tree preprocessed by
+    `preprocess`, see doc for `constrained_placements`.
+
+    Parameters
+    ----------
+    tree, budget, scenarios, costs, stats :
+        See doc for `constrained_placements`
+    leaves, directed, totals :
+        As returned by `preprocess`
+
+    Returns
+    -------
+    A generator of tuples (exp_dist, obs), see doc for `constrained_placements`
+    """
+    if costs is None:
+        costs = dict((x, 1) for x in leaves)
+    if stats is None:
+        stats = {}
+    for key in ('splits', 'pruned', 'states'):
+        stats.setdefault(key, 0)
+    if directed is not None:
+        directed.graph['stats'] = stats
+
+    leaf_set = set(leaves)
+    try:
+        for mandatory, forbidden in scenarios:
+            mandatory = set(mandatory)
+            forbidden = set(forbidden)
+            #only the leaves can be constrained
+            assert forbidden <= leaf_set and mandatory <= leaf_set
+            if forbidden.intersection(mandatory):
+                yield (INFINITY, ())
+                continue
+            allowed = tuple(x for x in leaves if x not in forbidden)
+            if len(allowed) < 2:
+                #one single sensor is useless
+                yield (INFINITY, ())
+                continue
+            if sum(costs[x] for x in allowed) <= budget:
+                #all the allowed leaves can hold a sensor
+                yield (utilities.exp_dist_from_sensors(tree, allowed), allowed)
+                continue
+            directed.graph['scope'] = utilities.constraint_scopes(directed,
+                    mandatory, forbidden)
+            
+            #place the sensors using the DP algorithm.
+            root = directed.graph['root']
+            exp_dist, obs = min(_opt(directed, root, k, True,
+                    _scope(directed, root)) for k in totals)
+            yield (float(exp_dist) / len(tree), obs)
+    finally:
+        stats['states'] += _opt.cache_info().currsize + \
+                _optc.cache_info().currsize
+        _optc.cache_clear()
+        _opt.cache_clear()
+
+
+def best_placements(tree, budget, costs=None):
+    """
+    Generate lazily all the placements of `budget` sensors on a tree, in
+    non-decreasing order of expected distance.
+
+    Parameters
+    ----------
+    tree : networkx.Graph
+        See doc for `optimal_placement`
+    budget : int
+        See doc for `optimal_placement`
+    costs : dict, optional
+        See doc for `optimal_placement`
+
+    Returns
+    -------
+    A generator of tuples (exp_dist, obs), see doc for `optimal_placement`.
+    The first one is an optimal placement.
+    """
+    leaves, directed, totals = preprocess(tree, budget, costs)
+    if directed is None:
+        yield (0, tuple(leaves))
+        return
+    
+    top = ('top', tuple(totals))
+    best = kbest.KBest(lambda state: _candidates(directed, state))
+    for exp_dist, obs in best.solutions(top):
+        yield (float(exp_dist) / len(tree), obs)
+
+
+def preprocess(tree, budget, costs=None, epsilon=None, prune=False):
+    """
+    Root the tree and attach to it what the DP algorithm needs, which
+    includes all that the DP algorithm of `prob_err` needs.
+
+    Parameters
+    ----------
+    See doc for `optimal_placement`
 
+    Returns
+    -------
+    (leaves, directed, totals) : tuple
+        `leaves` are the leaves of the tree, `directed` the directed tree
+        (see doc for `_opt`), or None if all leaves can hold a sensor, and
+        `totals` the possible total costs of the sensors. They can be given
+        to `solve` or to `prob_err.solve`.
+    """
     leaves = utilities.find_leaves(tree)
-    if budget >= len(leaves):
-        return (0, tuple(leaves))    
+    unit_costs = costs is None
+    if unit_costs:
+        costs = dict((x, 1) for x in leaves)
+    #one single sensor is useless
+    assert sum(sorted(costs[x] for x in leaves)[:2]) <= budget
+    if sum(costs[x] for x in leaves) <= budget:
+        return (leaves, None, None)
+    if unit_costs:
+        #all the budget is used
+        totals = [budget]
+    else:
+        if epsilon is not None:
+            costs, budget = utilities.scale_costs(costs, budget, epsilon)
+        #the sensors may cost less than the budget, but there are two or more
+        totals = xrange(sum(sorted(costs[x] for x in leaves)[:2]), budget + 1)
 
     #define a non-leaf root arbitrarily
     root = random.choice(filter(lambda x: x not in leaves, tree.nodes()))
@@ -55,20 +247,20 @@ def optimal_placement(tree, budget):
     #preprocessing to precompute expected distance for every class
     directed = preprocess_exp_dist.preprocess(tree, root)
     
-    #add the budget to the tree as an attribute
-    directed.graph['budget'] = budget
-    
-    #place the sensors using the DP algorithm.
-    exp_dist, obs = _opt(directed, root, budget)
-    _optc.cache_clear()
-    _opt.cache_clear()
-    
-    return (float(exp_dist) / len(tree), obs)
+    #add the costs to the leaves as an attribute
+    for x in leaves:
+        directed.node[x]['cost'] = costs[x]
 
+    #summarize the subtrees to know how many sensors they can hold
+    directed.graph['prune'] = prune
+    if prune:
+        utilities.subtree_groups(directed, root)
+
+    return (leaves, directed, totals)
 
 
 @functools.lru_cache(maxsize=None)
-def _opt(tree, x, k):
+def _opt(tree, x, k, alone, constraints):
     """
     Place `k` sensors on the subtree rooted at `x` in an optimal way.
     
@@ -78,14 +270,21 @@ def _opt(tree, x, k):
         A directed tree on which to place the sensors. Each node must contain
         an attribute `size` with the size of the subtree rooted at the node and
         an attribute `subtree`containing a tuple with all the nodes in the
-        subtree rooted at that node. The tree itself has an attribute `dists`
+        subtree rooted at that node, and each leaf an attribute `cost` with
+        the cost of a sensor there. The tree itself has an attribute `dists`
         containing the dictionary of all the distances in the tree.
     x : node
         The root of the (sub)tree, i.e. the node starting from which the
         sensors will be placed
     k : int
-        The sensor budget, i.e. the number of sensors to be placed in `x`
-        and below.
+        The sensor budget, i.e. the total cost of the sensors to be placed in
+        `x` and below.
+    alone : bool
+        Whether no sensor is placed outside of the subtree rooted at `x`
+    constraints : frozenset
+        The constraints on the leaves of the subtree rooted at `x`, see doc
+        for `utilities.constraint_scopes`. The tree has an attribute `scope`
+        associating nodes to such constraints.
 
     Returns
     -------
@@ -97,24 +296,25 @@ def _opt(tree, x, k):
     """
     assert k >= 0
     if tree.degree(x) == 1:
-        # We reached a leaf.
-        if k > 1:
+        # We reached a leaf (a single sensor is useless).
+        if alone or k != tree.node[x]['cost'] or (x, False) in constraints:
             return (INFINITY, ())
         else:
             return (0, (x,))
     # Otherwise, compute the error from that of the subtrees rooted at the
     # children.
     children = tuple(tree.successors(x))
-    if tree.graph['root'] != x and tree.graph['budget'] == k:
+    if tree.graph['root'] != x and alone:
         non_sensored = (tree.predecessors(x)[0],)
     else: 
         non_sensored = tuple()
-    exp_dist, obs = _optc(tree, x, k, children, non_sensored)
+    exp_dist, obs = _optc(tree, x, k, children, non_sensored, alone,
+            constraints)
     return exp_dist, obs
 
 
 @functools.lru_cache(maxsize=None)
-def _optc(tree, x, k, children, non_sensored):
+def _optc(tree, x, k, children, non_sensored, alone, constraints):
     """
     Place sensors in the children of `x` (or a subset thereof) in an optimal
     way, using a dynamic programming algorithm.
@@ -137,6 +337,11 @@ def _optc(tree, x, k, children, non_sensored):
     non_sensored: tuple
         The (subset of) neighboring subtrees of x that have been assigned no
         sensor
+    alone : bool
+        Whether no sensor is placed outside of the subtrees rooted at
+        `children`
+    constraints : frozenset
+        The constraints on the leaves of the subtrees rooted at `children`
     Returns
     -------
     (exp_dist, obs) : tuple
@@ -151,34 +356,157 @@ def _optc(tree, x, k, children, non_sensored):
         if k > 0:
             return (INFINITY, ()) #some sensors are wasted
     if k == 0:
-        equiv_neighs = non_sensored + children
-        #We sort the tuple to look it up in the dictionary 'exp_dist'
-        #the node predecessor, if present, has to come first
-        if len(equiv_neighs) > 1 and x!=tree.graph['root'] and \
-                (equiv_neighs[0]==tree.predecessors(x)[0]):
-            equiv_neighs = (equiv_neighs[0],) + tuple(sorted(equiv_neighs[1:]))
-        else:
-            equiv_neighs = tuple(sorted(equiv_neighs))
-        return (tree.graph['exp_dist'][x][equiv_neighs], ())
+        if utilities.has_mandatory(constraints):
+            return (INFINITY, ())
+        return (_class_exp_dist(tree, x, non_sensored + children), ())
     results = list()
-    #if no other sensor has been placed and x is not the root we try to
-    #allocate all the budget to each single subtrees
-    if tree.graph['root'] != x and tree.graph['budget'] == k:
-        for c in children:
-             e_c, o_c = _opt(tree, c, k)
-             results.append((e_c, o_c))
+    first, rest = children[0], children[1:]
+    first_constraints = _scope(tree, first)
+    rest_constraints = constraints - first_constraints
+    #if no other sensor has been placed we try to allocate all the budget to
+    #the first child (the next ones are tried when it receives no sensor)
+    if alone and not utilities.has_mandatory(rest_constraints) and \
+            _fits(tree, k, first):
+        e_c, o_c = _opt(tree, first, k, True, first_constraints)
+        results.append((e_c, o_c))
     #Otherwise, the error is composed of a part below (subtree rooted at first
     #child) and a part to the right (remaining children)
-    first, rest = children[0], children[1:]
     #First the case in which we put 0 sensors in first and 
     #so we have to add it to the unobserved children
-    e0, o0 = _optc(tree, x, k, rest, non_sensored + (first, ))
+    if utilities.has_mandatory(first_constraints) or \
+            not _fits(tree, k, x, len(rest)):
+        e0, o0 = (INFINITY, ())
+    else:
+        e0, o0 = _optc(tree, x, k, rest, non_sensored + (first, ), alone,
+                rest_constraints)
     results.append((e0, o0))
+    best = min(results)
     #Otherwise split the budget
-    h = min(k, tree.graph['budget']-1) #maximum budget sent to a single subtree
-    for l in xrange(1, h+1):
-        e1, o1 = _opt(tree, first, l)
-        e2, o2 = _optc(tree, x, k - l, rest, non_sensored)
-        results.append((e1 + e2, o1 + o2))
-    return min(results)
+    h = k - 1 if alone else k #maximum budget sent to a single subtree
+    splits = _splits(tree, x, k, h, first, rest, non_sensored,
+            rest_constraints)
+    for i, (bound, l) in enumerate(splits):
+        if bound >= best[0]:
+            #the remaining splits cannot do better
+            tree.graph['stats']['pruned'] += len(splits) - i
+            break
+        e1, o1 = _opt(tree, first, l, False, first_constraints)
+        e2, o2 = _optc(tree, x, k - l, rest, non_sensored, False,
+                rest_constraints)
+        best = min(best, (e1 + e2, o1 + o2))
+    return best
+
+
+def _splits(tree, x, k, h, first, rest, non_sensored, rest_constraints):
+    """
+    List the splits of the budget `k` between the subtree rooted at `first`,
+    which receives l between 1 and `h`, and those rooted at `rest`, as tuples
+    (bound, l) where `bound` is a lower bound on the (unscaled) expected
+    distance.
+
+    When pruning, the splits that cannot be feasible are left out and the
+    others are sorted by bound: the bound is the expected distance of the
+    class of `x` if `rest` receive no sensor, and 0 otherwise. When not
+    pruning, all splits are listed with an infinitely small bound.
+    """
+    tree.graph['stats']['splits'] += h
+    if not tree.graph['prune']:
+        return [(-INFINITY, l) for l in xrange(1, h+1)]
+    first_capacity = tree.node[first]['group'][2]
+    rest_capacity = tree.node[x]['suffixes'][len(rest)][2]
+    splits = []
+    for l in xrange(max(1, k - rest_capacity), min(h, first_capacity) + 1):
+        if l < k:
+            splits.append((0, l))
+        elif not utilities.has_mandatory(rest_constraints):
+            splits.append((_class_exp_dist(tree, x, non_sensored + rest), l))
+    tree.graph['stats']['pruned'] += h - len(splits)
+    splits.sort()
+    return splits
+
+
+def _fits(tree, k, x, nb_children=None):
+    """
+    Return False if pruning and the leaves of the subtree rooted at `x`, or
+    of those rooted at its last `nb_children` children, cost less than `k`
+    in total, see doc for `utilities.subtree_groups`.
+    """
+    if not tree.graph['prune']:
+        return True
+    if nb_children is None:
+        return k <= tree.node[x]['group'][2]
+    return k <= tree.node[x]['suffixes'][nb_children][2]
+
 
+def _scope(tree, x):
+    """
+    Return the constraints on the leaves of the subtree rooted at `x`.
+    """
+    return tree.graph['scope'].get(x, NO_CONSTRAINTS)
+
+
+def _class_exp_dist(tree, x, equiv_neighs):
+    """
+    Return the (unscaled) expected distance of the class made of `x` and
+    of the neighboring subtrees `equiv_neighs` of `x`.
+    """
+    #We sort the tuple to look it up in the dictionary 'exp_dist'
+    #the node predecessor, if present, has to come first
+    if len(equiv_neighs) > 1 and x!=tree.graph['root'] and \
+            (equiv_neighs[0]==tree.predecessors(x)[0]):
+        equiv_neighs = (equiv_neighs[0],) + tuple(sorted(equiv_neighs[1:]))
+    else:
+        equiv_neighs = tuple(sorted(equiv_neighs))
+    return tree.graph['exp_dist'][x][equiv_neighs]
+
+
+def _candidates(tree, state):
+    """
+    List the candidates of a state of the DP algorithm, for the enumeration
+    of the best placements. They are those compared by `_opt` and `_optc`.
+
+    Parameters
+    ----------
+    tree : networkx.DiGraph
+        See doc for `_opt`
+    state : tuple
+        ('opt', x, k, alone) or ('optc', x, k, children, non_sensored, alone)
+        for the arguments of `_opt` and `_optc`, or ('top', totals) for the
+        best placement among all possible total costs
+
+    Returns
+    -------
+    A list of tuples (exp_dist, obs, substates), see doc for `kbest.KBest`
+    """
+    if state[0] == 'top':
+        root = tree.graph['root']
+        return [(0, (), (('opt', root, k, True),)) for k in state[1]]
+    if state[0] == 'opt':
+        _, x, k, alone = state
+        if tree.degree(x) == 1:
+            if alone or k != tree.node[x]['cost']:
+                return []
+            return [(0, (x,), ())]
+        children = tuple(tree.successors(x))
+        if tree.graph['root'] != x and alone:
+            non_sensored = (tree.predecessors(x)[0],)
+        else:
+            non_sensored = tuple()
+        return [(0, (), (('optc', x, k, children, non_sensored, alone),))]
+    _, x, k, children, non_sensored, alone = state
+    if len(children) == 0 and k > 0:
+        return []
+    if k == 0:
+        return [(_class_exp_dist(tree, x, non_sensored + children), (), ())]
+    candidates = []
+    first, rest = children[0], children[1:]
+    if alone:
+        candidates.append((0, (), (('opt', first, k, True),)))
+    candidates.append((0, (), (('optc', x, k, rest,
+                                non_sensored + (first, ), alone),)))
+    h = k - 1 if alone else k
+    for l in xrange(1, h+1):
+        candidates.append((0, (), (('opt', first, l, False),
+                                   ('optc', x, k - l, rest, non_sensored,
+                                    False))))
+    return candidates
@@ -0,0 +1,182 @@
+"""Approximate sensor placement for trees.
+
+Provides a greedy algorithm to compute a placement of sensors in the leaves of
+a tree that approximately minimizes either the error probability
+(`prob_err`) or the expected distance between the real and the estimated
+source (`exp_dist`). Unlike the dynamic programming algorithms, it runs in
+time close to linear in the size of the tree, so it can be used on trees that
+are too large for them. The returned objective is the exact one of the
+returned sensors.
+
+A simple example:
+
+   import networkx as nx
+   tree = nx.barabasi_albert_graph(100, 1)
+   nb_sensors = 10
+   perr, sensors = greedy_placement(tree, nb_sensors, 'prob_err')
+   gap, approx, opt = approximation_gap(tree, nb_sensors, 'prob_err')
+
+"""
+
+import heapq
+import networkx as nx
+
+import exp_dist
+import prob_err
+import utilities
+
+CLASS_COSTS = {'prob_err': utilities.prob_err_class_cost,
+               'exp_dist': utilities.exp_dist_class_cost}
+
+OPTIMAL_PLACEMENTS = {'prob_err': prob_err.optimal_placement,
+                      'exp_dist': exp_dist.optimal_placement}
+
+
+def greedy_placement(tree, budget, objective='prob_err'):
+    """
+    Place `budget` sensors on a tree greedily.
+
+    The first sensor is placed at an end of a longest path of the tree, which
+    is then rooted at it. Every other sensor is the leaf whose addition
+    decreases the objective the most. Once the tree is rooted at a sensor,
+    adding a leaf only resolves the path from the leaf up to the closest
+    resolved node, so its gain is evaluated in time proportional to the
+    length of this path; gains are re-evaluated lazily, in decreasing order
+    of their last known value.
+
+    Parameters
+    ----------
+    tree : networkx.Graph
+        A tree (undirected) on which to place the sensors.
+    budget : int
+        The sensor budget, i.e. the number of nodes that can be chosen as
+        sensors
+    objective : str
+        Either 'prob_err' or 'exp_dist'.
+
+    Returns
+    -------
+    (value, obs) : tuple
+        `value` is the error probability or the expected distance of the
+        placement, and `obs` a tuple containing the sensors.
+    """
+
+    #one single sensor is useless
+    assert budget >= 2
+
+    assert nx.is_tree(tree)
+
+    class_cost = CLASS_COSTS[objective]
+    leaves = utilities.find_leaves(tree)
+    if budget >= len(leaves):
+        return (0, tuple(leaves))
+
+    #the first sensor is an end of a longest path of the tree
+    dists = nx.single_source_dijkstra_path_length(tree, leaves[0])
+    root = max(leaves, key=lambda x: dists[x])
+    order, parent = utilities.rooted_tree(tree, root)
+    contrib, agg = utilities.subtree_aggregates(tree, order, parent)
+
+    #`free` associates every resolved node to the aggregate of its children
+    #without sensors below, which are in the same class
+    free = {root: agg[root]}
+
+    #compute the initial gains of all leaves at once: `acc` is the cost of
+    #the classes created on the path from a node up to the root, and `top`
+    #the child of the root above the node
+    acc = {}
+    top = {}
+    heap = []
+    for x in order[1:]:
+        p = parent[x]
+        if p == root:
+            acc[x] = 0
+            top[x] = x
+        else:
+            acc[x] = acc[p] + class_cost(
+                utilities.sub_aggregates(agg[p], contrib[x]))
+            top[x] = top[p]
+        if tree.degree(x) == 1:
+            gain = class_cost(agg[root]) - acc[x] - class_cost(
+                utilities.sub_aggregates(agg[root], contrib[top[x]]))
+            heap.append((-gain, x))
+    heapq.heapify(heap)
+
+    sensors = [root]
+    while len(sensors) < budget:
+        _, x = heapq.heappop(heap)
+        path = _path_to_resolved(x, parent, free)
+        gain = _gain(path, parent, free, agg, contrib, class_cost)
+        if heap and gain < -heap[0][0]:
+            #the gain decreased, try again later
+            heapq.heappush(heap, (-gain, x))
+            continue
+        _resolve(path, parent, free, agg, contrib)
+        sensors.append(x)
+
+    value = sum(class_cost(free[x]) for x in free)
+    return (float(value) / len(tree), tuple(sensors))
+
+
+def approximation_gap(tree, budget, objective='prob_err'):
+    """
+    Compare the greedy placement with the optimal one.
+
+    Only use it on trees small enough for the `optimal_placement` of the
+    chosen objective.
+
+    Parameters
+    ----------
+    tree : networkx.Graph
+        See doc for `greedy_placement`
+    budget : int
+        See doc for `greedy_placement`
+    objective : str
+        See doc for `greedy_placement`
+
+    Returns
+    -------
+    (gap, approx, opt) : tuple
+        `approx` and `opt` are the (value, obs) tuples of the greedy and of
+        the optimal placement, and `gap` the difference between their values.
+    """
+    approx = greedy_placement(tree, budget, objective)
+    opt = OPTIMAL_PLACEMENTS[objective](tree, budget)
+    return (approx[0] - opt[0], approx, opt)
+
+
+def _path_to_resolved(x, parent, free):
+    """
+    Return the list of the nodes from `x` up to the closest resolved
+    ancestor, the latter excluded.
+    """
+    path = [x]
+    while parent[path[-1]] not in free:
+        path.append(parent[path[-1]])
+    return path
+
+
+def _gain(path, parent, free, agg, contrib, class_cost):
+    """
+    Compute the decrease of the (unscaled) objective obtained by resolving
+    the nodes in `path`.
+    """
+    top = path[-1]
+    u = parent[top]
+    gain = class_cost(free[u]) - class_cost(
+        utilities.sub_aggregates(free[u], contrib[top]))
+    for below, x in zip(path, path[1:]):
+        gain -= class_cost(utilities.sub_aggregates(agg[x], contrib[below]))
+    return gain
+
+
+def _resolve(path, parent, free, agg, contrib):
+    """
+    Mark as resolved the nodes in `path`, updating the classes.
+    """
+    top = path[-1]
+    u = parent[top]
+    free[u] = utilities.sub_aggregates(free[u], contrib[top])
+    free[path[0]] = agg[path[0]]
+    for below, x in zip(path, path[1:]):
+        free[x] = utilities.sub_aggregates(agg[x], contrib[below])
@@ -0,0 +1,130 @@
+"""Joint optimal sensor placement for trees.
+
+Computes both the placement of sensors in a tree that minimizes the error
+probability (see `prob_err`) and the one that minimizes the expected distance
+between the real and the estimated source (see `exp_dist`), rooting and
+preprocessing the tree only once, and evaluates each placement under the
+other objective.
+
+A simple example:
+
+   import networkx as nx
+   tree = nx.random_powerlaw_tree(100, tries=1000)
+   nb_sensors = 10
+   by_perr, by_exp_dist = joint_placement(tree, nb_sensors)
+   perr, exp_dist, sensors = by_perr
+
+"""
+
+import multiprocessing
+
+import exp_dist
+import prob_err
+import utilities
+
+INFINITY = float('infinity')
+
+SOLVERS = {'prob_err': prob_err.solve,
+           'exp_dist': exp_dist.solve}
+
+
+def joint_placement(tree, budget, costs=None, epsilon=None, mandatory=(),
+        forbidden=(), prune=False, parallel=False):
+    """
+    Place `budget` sensors on a tree in an optimal way for both objectives.
+
+    Parameters
+    ----------
+    tree : networkx.Graph
+        See doc for `prob_err.optimal_placement`
+    budget : int
+        See doc for `prob_err.optimal_placement`
+    costs : dict, optional
+        See doc for `prob_err.optimal_placement`
+    epsilon : float, optional
+        See doc for `prob_err.optimal_placement`
+    mandatory : iterable, optional
+        See doc for `prob_err.optimal_placement`
+    forbidden : iterable, optional
+        See doc for `prob_err.optimal_placement`
+    prune : bool, optional
+        See doc for `prob_err.optimal_placement`
+    parallel : bool, optional
+        Whether to run the DP algorithm for the error probability in another
+        process, started after the preprocessing. Where processes are forked
+        (e.g. on Linux), it inherits the preprocessed tree instead of
+        receiving a copy of it.
+
+    Returns
+    -------
+    (by_perr, by_exp_dist) : tuple
+        Tuples (perr, exp_dist, obs) for the placement `obs` minimizing the
+        error probability and for the one minimizing the expected distance,
+        with their error probability `perr` and expected distance
+        `exp_dist`. If the constraints cannot be met, both values are
+        infinite and `obs` is empty.
+    """
+    #the preprocessing for the expected distance also attaches to the tree
+    #all that the DP algorithm for the error probability needs
+    leaves, directed, totals = exp_dist.preprocess(tree, budget, costs,
+            epsilon, prune)
+    args = [(objective, tree, budget, [(mandatory, forbidden)], costs, leaves,
+             directed, totals) for objective in ('prob_err', 'exp_dist')]
+    if parallel:
+        receiver, sender = multiprocessing.Pipe(False)
+        worker = multiprocessing.Process(target=_solve_worker,
+                args=(args[0], sender))
+        worker.start()
+        #only the worker sends, so that receiving fails if it dies
+        sender.close()
+        try:
+            dist, dist_obs = _solve(args[1])
+            result = receiver.recv()
+        finally:
+            receiver.close()
+            worker.join()
+        if isinstance(result, Exception):
+            raise result
+        perr, perr_obs = result
+    else:
+        (perr, perr_obs), (dist, dist_obs) = map(_solve, args)
+
+    by_perr = (perr, _evaluate(tree, perr_obs, utilities.exp_dist_from_sensors),
+               perr_obs)
+    by_exp_dist = (_evaluate(tree, dist_obs, utilities.prob_err_from_sensors),
+                   dist, dist_obs)
+    return (by_perr, by_exp_dist)
+
+
+def _solve(args):
+    """
+    Compute the optimal placement for the objective named by the first
+    element of `args`, the others being those of its `solve`.
+    """
+    placements = SOLVERS[args[0]](*args[1:])
+    result = next(placements)
+    placements.close()
+    return result
+
+
+def _solve_worker(args, connection):
+    """
+    Compute the optimal placement in a worker process, see doc for `_solve`,
+    and send it, or the exception raised, through `connection`.
+    """
+    try:
+        connection.send(_solve(args))
+    except Exception as e:
+        connection.send(e)
+    finally:
+        connection.close()
+
+
+def _evaluate(tree, obs, objective):
+    """
+    Evaluate the placement `obs` with `objective`, which is infinite if the
+    placement is empty because the constraints could not be met.
+    """
+    if not obs:
+        return INFINITY
+    return objective(tree, obs)
@@ -0,0 +1,102 @@
+"""Lazy enumeration of the best solutions of a dynamic program.
+
+The dynamic programs of `prob_err` and `exp_dist` are described as a set of
+states, each of which has a list of candidates: a candidate combines one
+solution of each of a few substates, and its cost is a constant plus the
+costs of these solutions. The best solutions of every state are computed only
+when needed, from the best solutions of its substates, so that retrieving the
+m best solutions costs little more than computing the best one.
+
+A simple example:
+
+   kbest = KBest(candidates)
+   for cost, obs in itertools.islice(kbest.solutions(state), 10):
+       print cost, obs
+
+"""
+
+import heapq
+
+
+class KBest(object):
+    """
+    Enumerate the solutions of the states of a dynamic program in
+    non-decreasing order of cost.
+
+    Parameters
+    ----------
+    candidates : function
+        Maps a state to a list of candidates (cost, obs, substates): such a
+        candidate combines a solution of each state in the tuple `substates`,
+        its cost is `cost` plus their costs and its sensors are `obs`
+        followed by theirs. A state with no feasible solution has no
+        candidates. Distinct candidates must lead to distinct solutions.
+    """
+
+    def __init__(self, candidates):
+        self._candidates = candidates
+        #for every state: the candidates, the solutions found so far in
+        #non-decreasing order of cost, the heap of the next solutions and
+        #the ranks of substate solutions already pushed in the heap
+        self._edges = {}
+        self._found = {}
+        self._heaps = {}
+        self._pushed = {}
+
+    def solution(self, state, j):
+        """
+        Return the `j`-th best solution (cost, obs) of `state`, counting
+        from 0, or None if `state` has at most `j` solutions.
+        """
+        if state not in self._edges:
+            self._init(state)
+        found = self._found[state]
+        heap = self._heaps[state]
+        while len(found) <= j and heap:
+            cost, i, ranks, obs = heapq.heappop(heap)
+            found.append((cost, obs))
+            #the next solutions of the candidate use the next solution of
+            #one of the substates
+            for m in xrange(len(ranks)):
+                self._push(state, i, ranks[:m] + (ranks[m] + 1,) + ranks[m+1:])
+        if j < len(found):
+            return found[j]
+        return None
+
+    def solutions(self, state):
+        """
+        Generate all the solutions (cost, obs) of `state` in non-decreasing
+        order of cost.
+        """
+        j = 0
+        while True:
+            s = self.solution(state, j)
+            if s is None:
+                return
+            yield s
+            j += 1
+
+    def _init(self, state):
+        self._edges[state] = self._candidates(state)
+        self._found[state] = []
+        self._heaps[state] = []
+        self._pushed[state] = set()
+        for i, (_, _, substates) in enumerate(self._edges[state]):
+            self._push(state, i, (0,) * len(substates))
+
+    def _push(self, state, i, ranks):
+        """
+        Push in the heap of `state` the solution of its `i`-th candidate made
+        of the solutions of the substates with the given ranks, if they exist.
+        """
+        if (i, ranks) in self._pushed[state]:
+            return
+        self._pushed[state].add((i, ranks))
+        cost, obs, substates = self._edges[state][i]
+        for s, r in zip(substates, ranks):
+            sol = self.solution(s, r)
+            if sol is None:
+                return
+            cost += sol[0]
+            obs += sol[1]
+        heapq.heappush(self._heaps[state], (cost, i, ranks, obs))
@@ -1,8 +1,9 @@
 """Optimal sensor placement for trees.
 
 Provides an algorithm to compute a placement of sensors in a tree that
-minimizes the error probability. It only works for trees and assumes that all
-vertices have unit cost. 
+minimizes the error probability. It only works for trees. By default all
+vertices have unit cost; integer costs can be given to the leaves, in which
+case the budget bounds the total cost of the sensors.
 
 A simple example:
 
@@ -10,19 +11,25 @@ A simple example:
    tree = nx.barabasi_albert_graph(100, 1)
    nb_sensors = 10
    perr, sensors = optimal_placement(tree, nb_sensors)
+
+   costs = {x: random.randint(1, 5) for x in utilities.find_leaves(tree)}
+   perr, sensors = optimal_placement(tree, 20, costs)
    
 """
 
 import functools32 as functools
 import networkx as nx
 import random
+from sensor_placement import kbest
 from sensor_placement import utilities
 
 
 
 INFINITY = float('infinity')
+NO_CONSTRAINTS = frozenset()
 
-def optimal_placement(tree, budget):
+def optimal_placement(tree, budget, costs=None, epsilon=None, mandatory=(),
+        forbidden=(), prune=False, stats=None):
     """
     Place `budget` sensors on a tree in an optimal way.
 
@@ -32,23 +39,205 @@ def optimal_placement(tree, budget):
         A tree (undirected) on which to place the sensors.
     budget : int
         The sensor budget, i.e. the number of nodes that can be chosen as
-        sensors
+        sensors, or their maximum total cost if `costs` is given
+    costs : dict, optional
+        Associates every leaf to its (positive integer) cost. The running
+        time grows quadratically with the budget.
+    epsilon : float, optional
+        If given together with `costs`, the costs are scaled so that the
+        dynamic program only handles budgets of O(k / epsilon), k being the
+        largest number of sensors within the budget. The placement is then
+        at least as good as the optimal one, but its cost may exceed the
+        budget by a factor (1 + epsilon).
+    mandatory : iterable, optional
+        Leaves that must hold a sensor.
+    forbidden : iterable, optional
+        Leaves that cannot hold a sensor.
+    prune : bool, optional
+        Whether to skip the splits of the budget that cannot be feasible or
+        whose lower bound on the error is no better than that of a split
+        already evaluated. The optimal error is the same.
+    stats : dict, optional
+        If given, it receives the number of `splits` of the budget
+        considered, of those `pruned` and of the DP `states` computed.
 
     Returns
     -------
     (perr, obs) : tuple
         `perr` is the error probability, and `obs` a tuple containing the
-        sensors.
+        sensors. If the constraints cannot be met, `perr` is infinite and
+        `obs` is empty.
     """ 
     
-    #one single sensor is useless
-    assert budget >= 2
+    placements = constrained_placements(tree, budget,
+            [(mandatory, forbidden)], costs, epsilon, prune, stats)
+    perr, obs = next(placements)
+    placements.close()
+    return (perr, obs)
+
+
+def constrained_placements(tree, budget, scenarios, costs=None,
+        epsilon=None, prune=False, stats=None):
+    """
+    Place `budget` sensors on a tree in an optimal way under a sequence of
+    constraints on the leaves, preprocessing the tree only once.
+
+    From one scenario to the next, only the DP states of the nodes above the
+    constrained leaves are recomputed.
+
+    Parameters
+    ----------
+    tree : networkx.Graph
+        See doc for `optimal_placement`
+    budget : int
+        See doc for `optimal_placement`
+    scenarios : iterable
+        Tuples (mandatory, forbidden), see doc for `optimal_placement`. They
+        are read one at a time, so they can be chosen interactively.
+    costs : dict, optional
+        See doc for `optimal_placement`
+    epsilon : float, optional
+        See doc for `optimal_placement`
+    prune : bool, optional
+        See doc for `optimal_placement`
+    stats : dict, optional
+        See doc for `optimal_placement`, the counts are summed over all
+        scenarios.
 
+    Returns
+    -------
+    A generator of tuples (perr, obs), one for each scenario, see doc for
+    `optimal_placement`.
+    """
+    leaves, directed, totals = preprocess(tree, budget, costs, epsilon,
+            prune)
+    return solve(tree, budget, scenarios, costs, leaves, directed, totals,
+            stats)
+
+
+def solve(tree, budget, scenarios, costs, leaves, directed, totals,
+        stats=None):
+    """
+    Place the sensors for every scenario on a tree preprocessed by
+    `preprocess`, see doc for `constrained_placements`.
+
+    Parameters
+    ----------
+    tree, budget, scenarios, costs, stats :
+        See doc for `constrained_placements`
+    leaves, directed, totals :
+        As returned by `preprocess`
+
+    Returns
+    -------
+    A generator of tuples (perr, obs), see doc for `constrained_placements`
+    """
+    if costs is None:
+        costs = dict((x, 1) for x in leaves)
+    if stats is None:
+        stats = {}
+    for key in ('splits', 'pruned', 'states'):
+        stats.setdefault(key, 0)
+    if directed is not None:
+        directed.graph['stats'] = stats
+
+    leaf_set = set(leaves)
+    try:
+        for mandatory, forbidden in scenarios:
+            mandatory = set(mandatory)
+            forbidden = set(forbidden)
+            #only the leaves can be constrained
+            assert forbidden <= leaf_set and mandatory <= leaf_set
+            if forbidden.intersection(mandatory):
+                yield (INFINITY, ())
+                continue
+            allowed = tuple(x for x in leaves if x not in forbidden)
+            if len(allowed) < 2:
+                #one single sensor is useless
+                yield (INFINITY, ())
+                continue
+            if sum(costs[x] for x in allowed) <= budget:
+                #all the allowed leaves can hold a sensor
+                yield (utilities.prob_err_from_sensors(tree, allowed), allowed)
+                continue
+            directed.graph['scope'] = utilities.constraint_scopes(directed,
+                    mandatory, forbidden)
+            
+            #place the sensors using the DP algorithm
+            root = directed.graph['root']
+            err, obs = min(_opt(directed, root, k, True, _scope(directed, root))
+                    for k in totals)
+            yield (float(err) / len(tree), obs)
+    finally:
+        stats['states'] += _opt.cache_info().currsize + \
+                _optc.cache_info().currsize
+        _optc.cache_clear()
+        _opt.cache_clear()
+
+
+def best_placements(tree, budget, costs=None):
+    """
+    Generate lazily all the placements of `budget` sensors on a tree, in
+    non-decreasing order of error probability.
+
+    Parameters
+    ----------
+    tree : networkx.Graph
+        See doc for `optimal_placement`
+    budget : int
+        See doc for `optimal_placement`
+    costs : dict, optional
+        See doc for `optimal_placement`
+
+    Returns
+    -------
+    A generator of tuples (perr, obs), see doc for `optimal_placement`. The
+    first one is an optimal placement.
+    """
+    leaves, directed, totals = preprocess(tree, budget, costs)
+    if directed is None:
+        yield (0, tuple(leaves))
+        return
+    
+    top = ('top', tuple(totals))
+    best = kbest.KBest(lambda state: _candidates(directed, state))
+    for err, obs in best.solutions(top):
+        yield (float(err) / len(tree), obs)
+
+
+def preprocess(tree, budget, costs=None, epsilon=None, prune=False):
+    """
+    Root the tree and attach to it what the DP algorithm needs.
+
+    Parameters
+    ----------
+    See doc for `optimal_placement`
+
+    Returns
+    -------
+    (leaves, directed, totals) : tuple
+        `leaves` are the leaves of the tree, `directed` the directed tree
+        (see doc for `_opt`), or None if all leaves can hold a sensor, and
+        `totals` the possible total costs of the sensors.
+    """
     assert nx.is_tree(tree)
 
     leaves = utilities.find_leaves(tree)
-    if budget >= len(leaves):
-        return (0, tuple(leaves))
+    unit_costs = costs is None
+    if unit_costs:
+        costs = dict((x, 1) for x in leaves)
+    #one single sensor is useless
+    assert sum(sorted(costs[x] for x in leaves)[:2]) <= budget
+    if sum(costs[x] for x in leaves) <= budget:
+        return (leaves, None, None)
+    if unit_costs:
+        #all the budget is used
+        totals = [budget]
+    else:
+        if epsilon is not None:
+            costs, budget = utilities.scale_costs(costs, budget, epsilon)
+        #the sensors may cost less than the budget, but there are two or more
+        totals = xrange(sum(sorted(costs[x] for x in leaves)[:2]), budget + 1)
 
     #define a non-leaf root arbitrarily
     root = random.choice(filter(lambda x: x not in leaves, tree.nodes()))
@@ -58,21 +247,22 @@ def optimal_placement(tree, budget):
     for x in directed:
         directed.node[x]['size'] = utilities.size_subtree(directed, x)
     utilities.size_subtree.cache_clear()
+    for x in leaves:
+        directed.node[x]['cost'] = costs[x]
     
-    #add the budget and the root to the tree as an attribute
+    #add the root to the tree as an attribute
     directed.graph['root'] = root
-    directed.graph['budget'] = budget
-    
-    #place the sensors using the DP algorithm
-    err, obs = _opt(directed, root, budget)
-    _optc.cache_clear()
-    _opt.cache_clear()
-    
-    return (float(err) / len(tree), obs)
+
+    #summarize the subtrees to bound their error
+    directed.graph['prune'] = prune
+    if prune:
+        utilities.subtree_groups(directed, root)
+
+    return (leaves, directed, totals)
 
 
 @functools.lru_cache(maxsize=None)
-def _opt(tree, x, k):
+def _opt(tree, x, k, alone, constraints):
     """
     Place `k` sensors on the subtree rooted at `x` in an optimal way.
     
@@ -80,13 +270,20 @@ def _opt(tree, x, k):
     ----------
     tree : networkx.DiGraph
         A directed tree on which to place the sensors. Each node must contain
-        an attribute `size` with the size of the subtree rooted at the node.
+        an attribute `size` with the size of the subtree rooted at the node,
+        and each leaf an attribute `cost` with the cost of a sensor there.
     x : node
         The root of the (sub)tree, i.e. the node below which the
         sensors will be placed
     k : int
-        The sensor budget, i.e. the number of sensors to be placed and
+        The sensor budget, i.e. the total cost of the sensors to be placed
         below 'x'
+    alone : bool
+        Whether no sensor is placed outside of the subtree rooted at `x`
+    constraints : frozenset
+        The constraints on the leaves of the subtree rooted at `x`, see doc
+        for `utilities.constraint_scopes`. The tree has an attribute `scope`
+        associating nodes to such constraints.
         
     Returns
     -------
@@ -101,26 +298,28 @@ def _opt(tree, x, k):
     # First, we handle shortcuts and stopping conditions.
     if k == 0:
         # No more sensors in the budget.
-            return (tree.node[x]['size'], ())
+        if utilities.has_mandatory(constraints):
+            return (INFINITY, ())
+        return (tree.node[x]['size'], ())
     elif tree.node[x]['size'] == 1:
         # We reached a leaf.
-        if k > 1:
-            return (INFINITY, ()) #some sensors are wasted
+        if alone or k != tree.node[x]['cost'] or (x, False) in constraints:
+            return (INFINITY, ()) #some sensors are wasted or a single one
         else:
             return (0, (x,)) #NB (x)=x, (x,) is a tuple!
     # Otherwise, compute the error from that of the subtrees rooted at the
     # children.
     children = tuple(tree.successors(x))
-    e, o = _optc(tree, x, k, children)
+    e, o = _optc(tree, x, k, children, alone, constraints)
     #If a subtree (rooted at a node x != root) receives the whole budget, x
     #is not resolved and counts towards the error
-    if tree.graph['root'] != x and tree.graph['budget'] == k:
+    if tree.graph['root'] != x and alone:
          e += 1
     return e, o
 
 
 @functools.lru_cache(maxsize=None)
-def _optc(tree, x, k, children):
+def _optc(tree, x, k, children, alone, constraints):
     """
     Place sensors in the children of `x` (or a subset thereof) in an optimal
     way, using a dynamic programming algorithm.
@@ -140,6 +339,11 @@ def _optc(tree, x, k, children):
         See doc for `_opt`
     children : tuple
         The (subset of) children downstream of which we place the sensors
+    alone : bool
+        Whether no sensor is placed outside of the subtrees rooted at
+        `children`
+    constraints : frozenset
+        The constraints on the leaves of the subtrees rooted at `children`
 
     Returns
     -------
@@ -156,13 +360,113 @@ def _optc(tree, x, k, children):
         else:
             return (0, ())
     elif k == 0:
+        if utilities.has_mandatory(constraints):
+            return (INFINITY, ())
         return (sum(tree.node[n]['size'] for n in children), ())
     #Otherwise, the error is composed of a part below (subtree rooted at first
     #child) and a part to the right (remaining children.)
     first, rest = children[0], children[1:]
-    results = list()
-    for l in xrange(k+1):
-        e1, o1 = _opt(tree, first, l)
-        e2, o2 = _optc(tree, x, k - l, rest)
-        results.append((e1 + e2, o1 + o2))
-    return min(results)
+    first_constraints = _scope(tree, first)
+    rest_constraints = constraints - first_constraints
+    best = (INFINITY, ())
+    splits = _splits(tree, x, k, first, rest)
+    for i, (bound, l) in enumerate(splits):
+        if bound >= best[0]:
+            #the remaining splits cannot do better
+            tree.graph['stats']['pruned'] += len(splits) - i
+            break
+        e1, o1 = _opt(tree, first, l, alone and l == k, first_constraints)
+        e2, o2 = _optc(tree, x, k - l, rest, alone and l == 0,
+                rest_constraints)
+        best = min(best, (e1 + e2, o1 + o2))
+    return best
+
+
+def _splits(tree, x, k, first, rest):
+    """
+    List the splits of the budget `k` between the subtree rooted at `first`,
+    which receives l, and those rooted at `rest`, as tuples (bound, l) where
+    `bound` is a lower bound on the (unscaled) error.
+
+    When pruning, the splits that cannot be feasible are left out and the
+    others are sorted by bound. Otherwise, all splits are listed with an
+    infinitely small bound.
+    """
+    tree.graph['stats']['splits'] += k + 1
+    if not tree.graph['prune']:
+        return [(-INFINITY, l) for l in xrange(k+1)]
+    first_group = tree.node[first]['group']
+    rest_group = tree.node[x]['suffixes'][len(rest)]
+    splits = []
+    for l in xrange(max(0, k - rest_group[2]), min(k, first_group[2]) + 1):
+        splits.append((_bound(first_group, l) + _bound(rest_group, k - l), l))
+    tree.graph['stats']['pruned'] += k + 1 - len(splits)
+    splits.sort()
+    return splits
+
+
+def _bound(group, k):
+    """
+    Return a lower bound on the (unscaled) error in a group of subtrees
+    receiving a budget `k`, see doc for `utilities.subtree_groups`.
+
+    Each sensor resolves at most the nodes on its path to the root of its
+    subtree, and all nodes are unresolved if there is no sensor.
+    """
+    size, depth, capacity, min_cost, nb_leaves = group
+    if k == 0:
+        return size
+    nb_sensors = min(k // min_cost, nb_leaves)
+    return max(0, size - nb_sensors * depth)
+
+
+def _scope(tree, x):
+    """
+    Return the constraints on the leaves of the subtree rooted at `x`.
+    """
+    return tree.graph['scope'].get(x, NO_CONSTRAINTS)
+
+
+def _candidates(tree, state):
+    """
+    List the candidates of a state of the DP algorithm, for the enumeration
+    of the best placements. They are those compared by `_opt` and `_optc`.
+
+    Parameters
+    ----------
+    tree : networkx.DiGraph
+        See doc for `_opt`
+    state : tuple
+        ('opt', x, k, alone) or ('optc', x, k, children, alone) for the
+        arguments of `_opt` and `_optc`, or ('top', totals) for the best
+        placement among all possible total costs
+
+    Returns
+    -------
+    A list of tuples (err, obs, substates), see doc for `kbest.KBest`
+    """
+    if state[0] == 'top':
+        root = tree.graph['root']
+        return [(0, (), (('opt', root, k, True),)) for k in state[1]]
+    if state[0] == 'opt':
+        _, x, k, alone = state
+        if k == 0:
+            return [(tree.node[x]['size'], (), ())]
+        elif tree.node[x]['size'] == 1:
+            if alone or k != tree.node[x]['cost']:
+                return []
+            return [(0, (x,), ())]
+        e = 1 if tree.graph['root'] != x and alone else 0
+        children = tuple(tree.successors(x))
+        return [(e, (), (('optc', x, k, children, alone),))]
+    _, x, k, children, alone = state
+    if len(children) == 0:
+        if k > 0:
+            return []
+        return [(0, (), ())]
+    elif k == 0:
+        return [(sum(tree.node[n]['size'] for n in children), (), ())]
+    first, rest = children[0], children[1:]
+    return [(0, (), (('opt', first, l, alone and l == k),
+                     ('optc', x, k - l, rest, alone and l == 0)))
+            for l in xrange(k+1)]
@@ -11,14 +11,30 @@ def prob_err_from_cardinalities(len_classes):
     return e
 
 
-def prob_err(tree, leaves, budget):
+def placements(leaves, budget, costs=None):
+    """Generate all placements of `budget` sensors in the leaves or, if
+    `costs` is given, all placements of at least two sensors whose total cost
+    is at most `budget`
+    
+    """
+    if costs is None:
+        for sensors in itertools.combinations(leaves, budget):
+            yield sensors
+        return
+    for nb_sensors in xrange(2, len(leaves) + 1):
+        for sensors in itertools.combinations(leaves, nb_sensors):
+            if sum(costs[x] for x in sensors) <= budget:
+                yield sensors
+
+
+def prob_err(tree, leaves, budget, costs=None):
     
     assert budget >= 2
     
     distance_matrix = nx.floyd_warshall(tree)
     opt_err = 2
     opt_sensors = []
-    for sensors in itertools.combinations(leaves, budget):
+    for sensors in placements(leaves, budget, costs):
         (classes, cardinalities) = equivalence_classes(distance_matrix, sensors)
         err = prob_err_from_cardinalities(cardinalities)
         if err < opt_err:
@@ -36,7 +52,7 @@ def exp_dist_from_classes(distance_matrix, classes):
     return e/float(n)
 
 
-def exp_dist(tree, leaves, budget):
+def exp_dist(tree, leaves, budget, costs=None):
     
     assert budget >= 2
     
@@ -44,7 +60,7 @@ def exp_dist(tree, leaves, budget):
     opt_exp_dist = sum([sum(distance_matrix[u].values()) for u in
             distance_matrix])
     opt_sensors = []
-    for sensors in itertools.combinations(leaves, budget):
+    for sensors in placements(leaves, budget, costs):
         (classes, cardinalities) = equivalence_classes(distance_matrix, sensors)
         exp_dist = exp_dist_from_classes(distance_matrix, classes)
         if exp_dist < opt_exp_dist:
@@ -96,3 +112,243 @@ def size_subtree(tree, u):
         for c in children:
             size += size_subtree(tree, c)
         return size
+
+
+def rooted_tree(tree, root):
+    """Root an undirected tree at `root` without recursion
+
+    tree: networkx.Graph()
+        an undirected tree
+    root: the node at which the tree is rooted
+
+    Returns (order, parent): `order` lists the nodes in DFS preorder, so that
+    every node comes after its parent, and `parent` associates every node but
+    the root to its parent.
+
+    """
+    order = list(nx.dfs_preorder_nodes(tree, root))
+    parent = nx.dfs_predecessors(tree, root)
+    return order, parent
+
+
+def subtree_aggregates(tree, order, parent):
+    """Compute bottom-up, for every node, the contribution of its subtree to
+    the equivalence class of its parent and the aggregate of the contributions
+    of all its children
+
+    A contribution is a tuple (s, a, p, q) where `s` is the size of the
+    subtree, `a` the sum of the distances from the parent to all nodes in the
+    subtree, `p` the sum of the distances between all ordered pairs of nodes
+    in the subtree and `q` = a * s. An aggregate is the component-wise sum of
+    some contributions and describes the class made of a node and the
+    corresponding subtrees below it.
+
+    tree: networkx.Graph()
+        an undirected tree
+    order, parent:
+        as returned by `rooted_tree`
+
+    Returns (contrib, agg): dictionaries associating every node to its
+    contribution (the root excluded) and to the aggregate of its children.
+
+    """
+    agg = dict((x, (0, 0, 0, 0)) for x in order)
+    contrib = {}
+    for x in reversed(order):
+        if x not in parent:
+            continue
+        p = parent[x]
+        size = agg[x][0] + 1
+        a = agg[x][1] + tree[x][p].get('weight', 1) * size
+        contrib[x] = (size, a, class_distance(agg[x]), a * size)
+        agg[p] = add_aggregates(agg[p], contrib[x])
+    return contrib, agg
+
+
+def add_aggregates(agg1, agg2):
+    return tuple(i + j for i, j in zip(agg1, agg2))
+
+
+def sub_aggregates(agg1, agg2):
+    return tuple(i - j for i, j in zip(agg1, agg2))
+
+
+def class_distance(agg):
+    """Sum of the distances between all ordered pairs of nodes in the class
+    described by the aggregate `agg`
+    
+    """
+    s, a, p, q = agg
+    return p + 2*a + 2*(a*s - q)
+
+
+def prob_err_class_cost(agg):
+    """Unscaled error of the class described by the aggregate `agg`, i.e. the
+    number of nodes in the class minus one
+    
+    """
+    return agg[0]
+
+
+def exp_dist_class_cost(agg):
+    """Unscaled expected distance of the class described by the aggregate
+    `agg`
+    
+    """
+    return class_distance(agg)/float(agg[0] + 1)
+
+
+def objective_from_sensors(tree, sensors, class_cost):
+    """Compute the objective of a placement of sensors in linear time
+
+    When the tree is rooted at a sensor, a node is resolved if and only if
+    there is a sensor in the subtree rooted at it, and every unresolved node
+    is in the class of its closest resolved ancestor.
+
+    tree: networkx.Graph()
+        an undirected tree
+    sensors: tuple
+        the nodes holding a sensor
+    class_cost: function
+        maps the aggregate of a class to its (unscaled) cost, e.g.
+        `prob_err_class_cost` or `exp_dist_class_cost`
+
+    """
+    assert len(sensors) >= 1
+    
+    order, parent = rooted_tree(tree, sensors[0])
+    contrib, agg = subtree_aggregates(tree, order, parent)
+    sensored = set(sensors)
+    resolved = set()
+    for x in reversed(order):
+        if x in sensored:
+            resolved.add(x)
+        if x in resolved and x in parent:
+            resolved.add(parent[x])
+    #aggregate of the unresolved children of every resolved node
+    free = dict((x, agg[x]) for x in resolved)
+    for x in resolved:
+        if x in parent:
+            free[parent[x]] = sub_aggregates(free[parent[x]], contrib[x])
+    return sum(class_cost(free[x]) for x in resolved) / float(len(tree))
+
+
+def prob_err_from_sensors(tree, sensors):
+    return objective_from_sensors(tree, sensors, prob_err_class_cost)
+
+
+def exp_dist_from_sensors(tree, sensors):
+    return objective_from_sensors(tree, sensors, exp_dist_class_cost)
+
+
+def scale_costs(costs, budget, epsilon):
+    """Scale down the costs of the sensors to bound the size of the budget
+
+    Every cost c becomes floor(c / u) + 1 and the budget floor(budget / u) + m,
+    where m is the largest number of sensors within the budget and
+    u = epsilon * budget / m. Every placement within the budget is within the
+    scaled budget, and every placement within the scaled budget costs at most
+    (1 + epsilon) * budget. The scaled budget is at most m * (1 + 1/epsilon).
+
+    costs: dictionary
+        associates every candidate sensor to its (positive integer) cost
+    budget: integer
+        the maximum total cost of the sensors
+    epsilon: float
+        the allowed relative excess over the budget
+
+    Returns (scaled_costs, scaled_budget)
+    
+    """
+    assert epsilon > 0
+    assert all(c >= 1 for c in costs.values())
+    
+    nb_max = 0
+    total = 0
+    for c in sorted(costs.values()):
+        total += c
+        if total > budget:
+            break
+        nb_max += 1
+    unit = epsilon * budget / float(max(nb_max, 1))
+    if unit <= 1:
+        #scaling would not make the budget smaller
+        return costs, budget
+    scaled_costs = dict((x, int(c // unit) + 1) for x, c in costs.items())
+    return scaled_costs, int(budget // unit) + nb_max
+
+
+def constraint_scopes(tree, mandatory=(), forbidden=()):
+    """Find the constraints on the leaves below every node of a directed tree
+
+    Only the nodes on the paths from the constrained leaves to the root have
+    constraints below them.
+
+    tree: networkx.DiGraph()
+        a directed tree
+    mandatory: iterable
+        the leaves that must hold a sensor
+    forbidden: iterable
+        the leaves that cannot hold a sensor
+
+    Returns a dictionary associating every node with a constrained leaf in
+    the subtree rooted at it to a frozenset of tuples (leaf, is_mandatory)
+
+    """
+    scopes = collections.defaultdict(set)
+    for leaves, is_mandatory in ((mandatory, True), (forbidden, False)):
+        for x in leaves:
+            u = x
+            while True:
+                scopes[u].add((x, is_mandatory))
+                predecessors = tree.predecessors(u)
+                if not predecessors:
+                    break
+                u = predecessors[0]
+    return dict((u, frozenset(s)) for u, s in scopes.items())
+
+
+def has_mandatory(constraints):
+    return any(is_mandatory for _, is_mandatory in constraints)
+
+
+EMPTY_GROUP = (0, 0, 0, float('infinity'), 0)
+
+
+def subtree_groups(tree, root):
+    """Summarize the subtrees of a directed tree to bound the error of the
+    placements in them
+
+    A group of subtrees is summarized by a tuple (size, depth, capacity,
+    min_cost, nb_leaves): its number of nodes, the largest number of nodes
+    on a path from the root of a subtree to a leaf, the total cost and the
+    smallest cost of its leaves, and its number of leaves. Every node gets
+    an attribute `group` summarizing the subtree rooted at it, and an
+    attribute `suffixes` whose m-th element summarizes the subtrees rooted
+    at its last m children.
+
+    tree: networkx.DiGraph()
+        a directed tree, whose leaves have an attribute `cost`
+    root: the root of the tree
+
+    """
+    for x in nx.dfs_postorder_nodes(tree, root):
+        children = tree.successors(x)
+        if not children:
+            cost = tree.node[x]['cost']
+            tree.node[x]['suffixes'] = [EMPTY_GROUP]
+            tree.node[x]['group'] = (1, 1, cost, cost, 1)
+            continue
+        suffixes = [EMPTY_GROUP]
+        for c in reversed(children):
+            suffixes.append(merge_groups(suffixes[-1], tree.node[c]['group']))
+        size, depth, capacity, min_cost, nb_leaves = suffixes[-1]
+        tree.node[x]['suffixes'] = suffixes
+        tree.node[x]['group'] = (size + 1, depth + 1, capacity, min_cost,
+                nb_leaves)
+
+
+def merge_groups(group1, group2):
+    return (group1[0] + group2[0], max(group1[1], group2[1]),
+            group1[2] + group2[2], min(group1[3], group2[3]),
+            group1[4] + group2[4])
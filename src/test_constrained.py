@@ -0,0 +1,71 @@
+# This script generates random trees and, for a sequence of random
+# constraints (leaves that must or cannot hold a sensor), compares the
+# optimal placements computed by the dynamic programming algorithms on a
+# single preprocessed tree vs. the brute-force algorithm which tries out all
+# possible combinations of placing the sensors on the allowed leaves.
+
+import networkx as nx
+import random
+from sensor_placement import exp_dist
+from sensor_placement import prob_err
+from sensor_placement import utilities
+
+COMPARE_EPSILON = 0.000000001
+TEST_CASES = 100000
+MIN_NUMBER_OF_NODES = 10
+MAX_NUMBER_OF_NODES = 25
+NUMBER_OF_SCENARIOS = 3
+RANDOM_SEED = 14052015
+
+random.seed(RANDOM_SEED)
+
+for test_case in xrange(TEST_CASES):
+    n = random.randint(MIN_NUMBER_OF_NODES, MAX_NUMBER_OF_NODES)
+
+    try:
+        tree = nx.random_powerlaw_tree(n, seed=test_case, tries=100)
+    except:
+        print "Generating tree failed (this is due to how networkx.random_powerlaw_tree works and is OK), skipping test #%d." % test_case
+        continue
+        
+    leaves = utilities.find_leaves(tree)
+    k = random.randint(2, len(leaves))
+    scenarios = []
+    for i in xrange(NUMBER_OF_SCENARIOS):
+        constrained = random.sample(leaves, random.randint(0, len(leaves)))
+        cut = random.randint(0, min(k, len(constrained)))
+        scenarios.append((constrained[:cut], constrained[cut:]))
+
+    for module, evaluate in ((prob_err, utilities.prob_err_from_sensors),
+            (exp_dist, utilities.exp_dist_from_sensors)):
+        #any iterable can be given, e.g. a generator
+        given = [(mandatory if i % 2 else (x for x in mandatory), forbidden)
+                for i, (mandatory, forbidden) in enumerate(scenarios)]
+        results = module.constrained_placements(tree, k, given)
+        for (mandatory, forbidden), (value, sensors) in zip(scenarios,
+                results):
+            allowed = [x for x in leaves if x not in forbidden]
+            if len(allowed) < 2:
+                #one single sensor is useless
+                assert value == float('infinity') and sensors == ()
+                continue
+            if k >= len(allowed):
+                brute = [tuple(allowed)]
+            else:
+                brute = [s for s in utilities.placements(allowed, k)
+                        if set(mandatory) <= set(s)]
+            brute_value = min(evaluate(tree, s) for s in brute)
+            assert set(mandatory) <= set(sensors)
+            assert not set(forbidden) & set(sensors)
+            assert abs(value - evaluate(tree, sensors)) < COMPARE_EPSILON
+            assert abs(value - brute_value) < COMPARE_EPSILON
+
+        #only the leaves can be constrained
+        internal = random.choice([x for x in tree if x not in leaves])
+        try:
+            module.optimal_placement(tree, k, mandatory=[internal])
+        except AssertionError:
+            pass
+        else:
+            assert False, "a non-leaf was accepted as a mandatory sensor"
+    print "Test #%d passed!" % test_case
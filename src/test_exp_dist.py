@@ -14,6 +14,9 @@ TEST_CASES = 100000
 MIN_NUMBER_OF_NODES = 5
 MAX_NUMBER_OF_NODES = 25
 RANDOM_SEED = 14052015
+MAX_NUMBER_OF_LEAVES_WITH_COSTS = 10
+MAX_COST = 10
+EPSILON = 0.5
 
 random.seed(RANDOM_SEED)
 
@@ -34,4 +37,23 @@ for test_case in xrange(TEST_CASES):
     (dist, sensors) = exp_dist.optimal_placement(tree, k)
     (brute_expdist, brute_sensors) = utilities.exp_dist(tree, leaves, k)
     assert abs(dist - brute_expdist) < COMPARE_EPSILON
+    (dist, sensors) = exp_dist.optimal_placement(tree, k, prune=True)
+    assert abs(dist - brute_expdist) < COMPARE_EPSILON
+    
+    if len(leaves) <= MAX_NUMBER_OF_LEAVES_WITH_COSTS:
+        costs = dict((x, random.randint(1, MAX_COST)) for x in leaves)
+        budget = random.randint(sum(sorted(costs.values())[:2]),
+                sum(costs.values()))
+        (dist, sensors) = exp_dist.optimal_placement(tree, budget, costs)
+        (brute_expdist, brute_sensors) = utilities.exp_dist(tree, leaves, budget,
+                costs)
+        assert sum(costs[x] for x in sensors) <= budget
+        assert abs(dist - brute_expdist) < COMPARE_EPSILON
+        (dist, sensors) = exp_dist.optimal_placement(tree, budget, costs,
+                prune=True)
+        assert abs(dist - brute_expdist) < COMPARE_EPSILON
+        (dist, sensors) = exp_dist.optimal_placement(tree, budget, costs,
+                EPSILON)
+        assert sum(costs[x] for x in sensors) <= (1 + EPSILON) * budget
+        assert dist < brute_expdist + COMPARE_EPSILON
     print "Test #%d passed!" % test_case 
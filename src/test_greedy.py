@@ -0,0 +1,47 @@
+# This script generates random trees and checks the placements computed by
+# the greedy algorithm: their objective must be that computed by the
+# brute-force evaluation of the equivalence classes, and it cannot be better
+# than the optimal one computed by the dynamic programming algorithms.
+
+import networkx as nx
+import random
+from sensor_placement import greedy
+from sensor_placement import utilities
+
+COMPARE_EPSILON = 0.000000001
+TEST_CASES = 100000
+MIN_NUMBER_OF_NODES = 10
+MAX_NUMBER_OF_NODES = 25
+RANDOM_SEED = 14052015
+
+random.seed(RANDOM_SEED)
+
+for test_case in xrange(TEST_CASES):
+    n = random.randint(MIN_NUMBER_OF_NODES, MAX_NUMBER_OF_NODES)
+
+    try:
+        tree = nx.random_powerlaw_tree(n, seed=test_case, tries=100)
+    except:
+        print "Generating tree failed (this is due to how networkx.random_powerlaw_tree works and is OK), skipping test #%d." % test_case
+        continue
+        
+    leaves = utilities.find_leaves(tree)
+    k = random.randint(2, len(leaves))
+    distance_matrix = nx.floyd_warshall(tree)
+    
+    (gap, (perr, sensors), opt) = greedy.approximation_gap(tree, k, 'prob_err')
+    (classes, cardinalities) = utilities.equivalence_classes(distance_matrix,
+            sensors)
+    assert len(set(sensors)) == k and set(sensors) <= set(leaves)
+    assert abs(perr - utilities.prob_err_from_cardinalities(cardinalities)) \
+            < COMPARE_EPSILON
+    assert gap > -COMPARE_EPSILON
+    
+    (gap, (dist, sensors), opt) = greedy.approximation_gap(tree, k, 'exp_dist')
+    (classes, cardinalities) = utilities.equivalence_classes(distance_matrix,
+            sensors)
+    assert len(set(sensors)) == k and set(sensors) <= set(leaves)
+    assert abs(dist - utilities.exp_dist_from_classes(distance_matrix,
+            classes)) < COMPARE_EPSILON
+    assert gap > -COMPARE_EPSILON
+    print "Test #%d passed!" % test_case
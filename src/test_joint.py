@@ -0,0 +1,77 @@
+# This script generates random trees and compares the placements computed
+# jointly for both objectives on a single preprocessed tree vs. those
+# computed separately by the dynamic programming algorithms described in the
+# paper, and checks that each placement is evaluated correctly under the
+# other objective.
+
+import networkx as nx
+import random
+from sensor_placement import exp_dist
+from sensor_placement import joint
+from sensor_placement import prob_err
+from sensor_placement import utilities
+
+COMPARE_EPSILON = 0.000000001
+INFINITY = float('infinity')
+TEST_CASES = 100000
+MIN_NUMBER_OF_NODES = 5
+MAX_NUMBER_OF_NODES = 25
+PARALLEL_EVERY = 10
+RANDOM_SEED = 14052015
+MAX_NUMBER_OF_LEAVES_WITH_COSTS = 10
+MAX_COST = 10
+EPSILON = 0.5
+
+
+def check(tree, budget, parallel, **options):
+    by_perr, by_dist = joint.joint_placement(tree, budget, parallel=parallel,
+            **options)
+    (perr, sensors) = prob_err.optimal_placement(tree, budget, **options)
+    (dist, sensors) = exp_dist.optimal_placement(tree, budget, **options)
+    
+    assert by_perr[0] == perr or abs(by_perr[0] - perr) < COMPARE_EPSILON
+    assert by_dist[1] == dist or abs(by_dist[1] - dist) < COMPARE_EPSILON
+    for placement in (by_perr, by_dist):
+        if not placement[2]:
+            #the constraints cannot be met
+            assert placement[:2] == (INFINITY, INFINITY)
+            continue
+        assert abs(placement[0] - utilities.prob_err_from_sensors(tree,
+                placement[2])) < COMPARE_EPSILON
+        assert abs(placement[1] - utilities.exp_dist_from_sensors(tree,
+                placement[2])) < COMPARE_EPSILON
+    if by_perr[2]:
+        assert by_perr[0] < by_dist[0] + COMPARE_EPSILON
+        assert by_dist[1] < by_perr[1] + COMPARE_EPSILON
+
+
+random.seed(RANDOM_SEED)
+
+for test_case in xrange(TEST_CASES):
+    n = random.randint(MIN_NUMBER_OF_NODES, MAX_NUMBER_OF_NODES)
+
+    try:
+        tree = nx.random_powerlaw_tree(n, seed=test_case, tries=100)
+    except:
+        print "Generating tree failed (this is due to how networkx.random_powerlaw_tree works and is OK), skipping test #%d." % test_case
+        continue
+        
+    leaves = utilities.find_leaves(tree)
+    k = random.randint(2, len(leaves))
+    parallel = (test_case % PARALLEL_EVERY == 0)
+    
+    check(tree, k, parallel)
+    check(tree, k, parallel, prune=True)
+
+    constrained = random.sample(leaves, random.randint(0, len(leaves)))
+    cut = random.randint(0, min(k, len(constrained)))
+    check(tree, k, parallel, mandatory=constrained[:cut],
+            forbidden=constrained[cut:])
+
+    if len(leaves) <= MAX_NUMBER_OF_LEAVES_WITH_COSTS:
+        costs = dict((x, random.randint(1, MAX_COST)) for x in leaves)
+        budget = random.randint(sum(sorted(costs.values())[:2]),
+                sum(costs.values()))
+        check(tree, budget, parallel, costs=costs)
+        check(tree, budget, parallel, costs=costs, epsilon=EPSILON)
+    print "Test #%d passed!" % test_case
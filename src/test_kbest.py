@@ -0,0 +1,57 @@
+# This script generates random trees and compares the best placements
+# enumerated from the dynamic programming algorithms described in the paper
+# vs. all possible combinations of placing the sensors on the tree leaves,
+# sorted by probability of error or expected distance.
+
+import itertools
+import networkx as nx
+import random
+from sensor_placement import exp_dist
+from sensor_placement import prob_err
+from sensor_placement import utilities
+
+COMPARE_EPSILON = 0.000000001
+TEST_CASES = 100000
+MIN_NUMBER_OF_NODES = 10
+MAX_NUMBER_OF_NODES = 25
+MAX_NUMBER_OF_LEAVES_WITH_COSTS = 10
+MAX_COST = 10
+NUMBER_OF_PLACEMENTS = 10
+RANDOM_SEED = 14052015
+
+random.seed(RANDOM_SEED)
+
+for test_case in xrange(TEST_CASES):
+    n = random.randint(MIN_NUMBER_OF_NODES, MAX_NUMBER_OF_NODES)
+
+    try:
+        tree = nx.random_powerlaw_tree(n, seed=test_case, tries=100)
+    except:
+        print "Generating tree failed (this is due to how networkx.random_powerlaw_tree works and is OK), skipping test #%d." % test_case
+        continue
+        
+    leaves = utilities.find_leaves(tree)
+    k = random.randint(2, len(leaves))
+    costs = None
+    if len(leaves) <= MAX_NUMBER_OF_LEAVES_WITH_COSTS and random.random() < 0.5:
+        costs = dict((x, random.randint(1, MAX_COST)) for x in leaves)
+        k = random.randint(sum(sorted(costs.values())[:2]),
+                sum(costs.values()))
+    if costs is None and k == len(leaves):
+        brute = [tuple(leaves)]
+    elif costs is not None and sum(costs.values()) <= k:
+        brute = [tuple(leaves)]
+    else:
+        brute = list(utilities.placements(leaves, k, costs))
+    
+    for module, evaluate in ((prob_err, utilities.prob_err_from_sensors),
+            (exp_dist, utilities.exp_dist_from_sensors)):
+        brute_values = sorted(evaluate(tree, s) for s in brute)
+        best = list(itertools.islice(module.best_placements(tree, k, costs),
+                NUMBER_OF_PLACEMENTS))
+        assert len(best) == min(NUMBER_OF_PLACEMENTS, len(brute))
+        assert len(set(frozenset(s) for _, s in best)) == len(best)
+        for (value, sensors), brute_value in zip(best, brute_values):
+            assert abs(value - evaluate(tree, sensors)) < COMPARE_EPSILON
+            assert abs(value - brute_value) < COMPARE_EPSILON
+    print "Test #%d passed!" % test_case
@@ -14,6 +14,9 @@ TEST_CASES = 100000
 MIN_NUMBER_OF_NODES = 10
 MAX_NUMBER_OF_NODES = 25
 RANDOM_SEED = 14052015
+MAX_NUMBER_OF_LEAVES_WITH_COSTS = 10
+MAX_COST = 10
+EPSILON = 0.5
 
 random.seed(RANDOM_SEED)
 
@@ -33,6 +36,25 @@ for test_case in xrange(TEST_CASES):
     (brute_perr, brute_sensors) = utilities.prob_err(tree, leaves, k)
 
     assert abs(perr - brute_perr) < COMPARE_EPSILON
+    (perr, sensors) = prob_err.optimal_placement(tree, k, prune=True)
+    assert abs(perr - brute_perr) < COMPARE_EPSILON
+    
+    if len(leaves) <= MAX_NUMBER_OF_LEAVES_WITH_COSTS:
+        costs = dict((x, random.randint(1, MAX_COST)) for x in leaves)
+        budget = random.randint(sum(sorted(costs.values())[:2]),
+                sum(costs.values()))
+        (perr, sensors) = prob_err.optimal_placement(tree, budget, costs)
+        (brute_perr, brute_sensors) = utilities.prob_err(tree, leaves, budget,
+                costs)
+        assert sum(costs[x] for x in sensors) <= budget
+        assert abs(perr - brute_perr) < COMPARE_EPSILON
+        (perr, sensors) = prob_err.optimal_placement(tree, budget, costs,
+                prune=True)
+        assert abs(perr - brute_perr) < COMPARE_EPSILON
+        (perr, sensors) = prob_err.optimal_placement(tree, budget, costs,
+                EPSILON)
+        assert sum(costs[x] for x in sensors) <= (1 + EPSILON) * budget
+        assert perr < brute_perr + COMPARE_EPSILON
     print "Test #%d passed!" % test_case
     
     